@@ -1,5 +1,52 @@
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from functools import lru_cache
 from PIL import Image
+import numpy as np
 import os
+import queue
+import threading
+
+def write_png(image, output_path):
+    """
+    Save a PIL image or (H, W, C) uint8 array as PNG with fast compression.
+
+    zlib level 1 encodes several times faster than Pillow's default of 6;
+    the Android build crunches resource PNGs again for release anyway.
+    """
+    if not isinstance(image, Image.Image):
+        image = Image.fromarray(image)
+    image.save(output_path, compress_level=1)
+
+def alpha_bbox(alpha):
+    """
+    Return (top, bottom, left, right) of the non-transparent pixels, or None.
+
+    Projects the alpha plane onto each axis instead of collecting the
+    coordinates of every visible pixel.
+    """
+    rows = alpha.any(axis=1)
+    if not rows.any():
+        return None
+    cols = alpha.any(axis=0)
+    top = int(rows.argmax())
+    bottom = len(rows) - int(rows[::-1].argmax())
+    left = int(cols.argmax())
+    right = len(cols) - int(cols[::-1].argmax())
+    return top, bottom, left, right
+
+# Reused across make_square_and_resize calls; grown when a larger canvas is needed
+_scratch_canvas = None
+
+def _padded_canvas(canvas_size):
+    """Return a zeroed (canvas_size, canvas_size, 4) view of the scratch buffer."""
+    global _scratch_canvas
+    nbytes = canvas_size * canvas_size * 4
+    if _scratch_canvas is None or _scratch_canvas.size < nbytes:
+        _scratch_canvas = np.zeros(nbytes, dtype=np.uint8)
+    else:
+        _scratch_canvas[:nbytes].fill(0)
+    return _scratch_canvas[:nbytes].reshape(canvas_size, canvas_size, 4)
 
 def make_square_and_resize(input_path, output_path, final_size=432):
     """
@@ -12,38 +59,39 @@ def make_square_and_resize(input_path, output_path, final_size=432):
     if img.mode != 'RGBA':
         img = img.convert('RGBA')
 
-    width, height = img.size
+    # Work on the raw pixel buffer; crops below are views, not copies
+    arr = np.asarray(img)
+    height, width = arr.shape[:2]
 
     # Center crop to square
     if width != height:
         size = min(width, height)
         left = (width - size) // 2
         top = (height - size) // 2
-        img = img.crop((left, top, left + size, top + size))
+        arr = arr[top:top + size, left:left + size]
 
     # Trim transparency to get just the icon content
-    bbox = img.getbbox()
+    bbox = alpha_bbox(arr[..., 3])
     if bbox:
-        img = img.crop(bbox)
+        top, bottom, left, right = bbox
+        arr = arr[top:bottom, left:right]
 
     # Add padding for adaptive icon safe zone
     # Adaptive icons: 108dp total, safe zone is inner 66dp (61% of total)
     # Icon should be ~65% of canvas to stay in safe zone
-    w, h = img.size
+    h, w = arr.shape[:2]
     icon_size = max(w, h)
     canvas_size = int(icon_size / 0.65)
 
-    # Create transparent canvas
-    canvas = Image.new("RGBA", (canvas_size, canvas_size), (0, 0, 0, 0))
-
-    # Paste icon in center
+    # Create transparent canvas and place icon in center
+    canvas = _padded_canvas(canvas_size)
     paste_x = (canvas_size - w) // 2
     paste_y = (canvas_size - h) // 2
-    canvas.paste(img, (paste_x, paste_y), img)
+    canvas[paste_y:paste_y + h, paste_x:paste_x + w] = arr
 
     # Resize to final size
-    final_img = canvas.resize((final_size, final_size), Image.Resampling.LANCZOS)
-    final_img.save(output_path)
+    final_img = Image.fromarray(canvas).resize((final_size, final_size), Image.Resampling.LANCZOS)
+    write_png(final_img, output_path)
     print(f"[OK] Created {os.path.basename(output_path)} ({final_size}x{final_size})")
 
 def process_background(input_path, output_path, final_size=432):
@@ -52,27 +100,182 @@ def process_background(input_path, output_path, final_size=432):
 
     # Convert to RGB (backgrounds don't need transparency)
     if img.mode == 'RGBA':
-        # Create white background
-        bg = Image.new('RGB', img.size, (255, 255, 255))
-        bg.paste(img, mask=img.split()[3] if img.mode == 'RGBA' else None)
-        img = bg
+        # Composite over white in one pass: 255 - (255 - rgb) * alpha / 255
+        rgba = np.asarray(img).astype(np.uint16)
+        alpha = rgba[..., 3:]
+        rgb = 255 - ((255 - rgba[..., :3]) * alpha + 127) // 255
+        img = Image.fromarray(rgb.astype(np.uint8))
     elif img.mode != 'RGB':
         img = img.convert('RGB')
 
     # Resize to square if needed
     if img.size[0] != img.size[1]:
-        size = max(img.size)
-        squared = Image.new('RGB', (size, size), (255, 255, 255))
-        paste_x = (size - img.size[0]) // 2
-        paste_y = (size - img.size[1]) // 2
-        squared.paste(img, (paste_x, paste_y))
-        img = squared
+        w, h = img.size
+        size = max(w, h)
+        paste_x = (size - w) // 2
+        paste_y = (size - h) // 2
+
+        # Only the margins end up white, so fill those and copy the image in
+        squared = np.empty((size, size, 3), dtype=np.uint8)
+        squared[:paste_y] = 255
+        squared[paste_y + h:] = 255
+        squared[paste_y:paste_y + h, :paste_x] = 255
+        squared[paste_y:paste_y + h, paste_x + w:] = 255
+        squared[paste_y:paste_y + h, paste_x:paste_x + w] = np.asarray(img)
+        img = Image.fromarray(squared)
 
     # Resize to final size
     final_img = img.resize((final_size, final_size), Image.Resampling.LANCZOS)
-    final_img.save(output_path)
+    write_png(final_img, output_path)
     print(f"[OK] Created {os.path.basename(output_path)} ({final_size}x{final_size})")
 
+@lru_cache(maxsize=None)
+def _lanczos_coefficients(src, dst):
+    """
+    Compute LANCZOS taps for resampling src pixels down to dst along one axis.
+
+    Matches Pillow's LANCZOS filter (support of 3, widened by the scale
+    factor when downsampling). Returns (starts, weights) where output pixel i
+    is the weighted sum of input pixels starts[i] .. starts[i] + taps - 1.
+    Results are cached per (src, dst) and returned read-only.
+    """
+    scale = src / dst
+    filter_scale = max(scale, 1.0)
+    support = 3.0 * filter_scale
+
+    centers = (np.arange(dst) + 0.5) * scale
+    starts = np.maximum((centers - support + 0.5).astype(np.int64), 0)
+    stops = np.minimum((centers + support + 0.5).astype(np.int64), src)
+    taps = int((stops - starts).max())
+
+    positions = starts[:, None] + np.arange(taps)
+    x = (positions - centers[:, None] + 0.5) / filter_scale
+    weights = np.where(
+        (positions < stops[:, None]) & (np.abs(x) < 3.0),
+        np.sinc(x) * np.sinc(x / 3.0),
+        0.0,
+    )
+    weights /= weights.sum(axis=1, keepdims=True)
+    starts.flags.writeable = False
+    weights.flags.writeable = False
+    return starts, weights
+
+@lru_cache(maxsize=None)
+def _lanczos_matrix(src, dst):
+    """Expand the cached LANCZOS taps into a read-only (dst, src) weight matrix."""
+    starts, weights = _lanczos_coefficients(src, dst)
+    columns = starts[:, None] + np.arange(weights.shape[1])
+    rows = np.broadcast_to(np.arange(dst)[:, None], columns.shape)
+    valid = columns < src
+
+    matrix = np.zeros((dst, src), dtype=np.float32)
+    matrix[rows[valid], columns[valid]] = weights[valid]
+    matrix.flags.writeable = False
+    return matrix
+
+def fast_resize(arr, size):
+    """
+    Resize an (H, W, C) uint8 array to (size, size) with a separable LANCZOS.
+
+    Both passes are single matrix products, so the work runs in BLAS instead
+    of per-pixel Python. RGBA input is resampled with premultiplied alpha,
+    the same as Pillow, to avoid dark fringes around transparent edges.
+    """
+    height, width, channels = arr.shape
+    pixels = arr.astype(np.float32)
+    if channels == 4:
+        pixels[..., :3] = np.rint(pixels[..., :3] * pixels[..., 3:] / 255.0)
+
+    cols = _lanczos_matrix(width, size)
+    rows = cols if width == height else _lanczos_matrix(height, size)
+
+    # Horizontal pass per row, then vertical pass over every column at once.
+    # Pillow keeps the intermediate as 8-bit, so clamp it the same way.
+    pixels = np.clip(np.rint(np.matmul(cols, pixels)), 0.0, 255.0)
+    pixels = np.dot(rows, pixels.reshape(height, size * channels))
+    pixels = np.clip(np.rint(pixels), 0.0, 255.0).reshape(size, size, channels)
+
+    if channels == 4:
+        alpha = pixels[..., 3:]
+        np.divide(pixels[..., :3] * 255.0, alpha, out=pixels[..., :3], where=alpha > 0)
+
+    return np.clip(np.rint(pixels), 0, 255).astype(np.uint8)
+
+def _png_writer(write_queue, errors):
+    """Save (array, path) items from the queue until a None sentinel arrives."""
+    while True:
+        item = write_queue.get()
+        if item is None:
+            break
+        arr, output_path = item
+        try:
+            write_png(arr, output_path)
+        except Exception as e:
+            errors.append(e)
+
+@contextmanager
+def png_writers(num_writers=4, max_pending=8):
+    """
+    Yield a bounded queue whose (array, path) items are saved on writer threads.
+
+    PNG encoding releases the GIL inside zlib, so saves overlap with the
+    resizing that produces the next item. All writes have finished when the
+    with-block exits; the first failed save is re-raised there.
+    """
+    write_queue = queue.Queue(maxsize=max_pending)
+    errors = []
+    writers = [
+        threading.Thread(target=_png_writer, args=(write_queue, errors), daemon=True)
+        for _ in range(num_writers)
+    ]
+    for writer in writers:
+        writer.start()
+
+    try:
+        yield write_queue
+    finally:
+        for _ in writers:
+            write_queue.put(None)
+        for writer in writers:
+            writer.join()
+
+    if errors:
+        raise errors[0]
+
+def resize_density_chain(job):
+    """
+    Resize one source icon to every density, largest first.
+
+    Each step downsamples an earlier output rather than the original
+    source. Sizes that divide an image produced so far (432 -> 216,
+    324 -> 162, 216 -> 108) use Pillow's box-filter reduce() from the
+    smallest such image; the rest step down from the previous output with
+    LANCZOS.
+    """
+    source_path, outputs = job
+    with Image.open(source_path) as source_img:
+        # Decode the PNG once up front; every step below works from memory
+        if source_img.mode not in ('RGB', 'RGBA'):
+            source_img = source_img.convert('RGBA')
+        source_arr = np.asarray(source_img)
+
+    produced = [source_arr]
+    with png_writers() as write_queue:
+        for size, output_path in sorted(outputs, reverse=True):
+            multiples = [
+                arr for arr in produced
+                if arr.shape[0] == arr.shape[1] and arr.shape[0] % size == 0
+            ]
+            if multiples:
+                base = min(multiples, key=lambda arr: arr.shape[0])
+                factor = base.shape[0] // size
+                resized = np.asarray(Image.fromarray(base).reduce(factor))
+            else:
+                resized = fast_resize(produced[-1], size)
+
+            produced.append(resized)
+            write_queue.put((resized, output_path))
+
 def create_all_densities(xxxhdpi_dir, output_base_dir):
     """Create all Android density versions from xxxhdpi sources."""
     densities = {
@@ -88,22 +291,29 @@ def create_all_densities(xxxhdpi_dir, output_base_dir):
         "ic_launcher_monochrome.png"
     ]
 
+    # Each icon is independent, so fan them out across processes
+    jobs = []
+    created = []
     for icon_file in icon_files:
         source_path = os.path.join(xxxhdpi_dir, icon_file)
         if not os.path.exists(source_path):
             print(f"[WARN] {icon_file} not found, skipping")
             continue
 
-        source_img = Image.open(source_path)
-
+        outputs = []
         for density, size in densities.items():
             output_dir = os.path.join(output_base_dir, f"mipmap-{density}")
             os.makedirs(output_dir, exist_ok=True)
+            outputs.append((size, os.path.join(output_dir, icon_file)))
+        jobs.append((source_path, outputs))
+        created.append(icon_file)
 
-            resized = source_img.resize((size, size), Image.Resampling.LANCZOS)
-            output_path = os.path.join(output_dir, icon_file)
-            resized.save(output_path)
+    # One worker per icon; os.cpu_count() can exceed Windows' 61-worker limit
+    if jobs:
+        with ProcessPoolExecutor(max_workers=len(jobs)) as executor:
+            list(executor.map(resize_density_chain, jobs))
 
+    for icon_file in created:
         print(f"[OK] Created {icon_file} for all densities (mdpi through xxhdpi)")
 
 def main():
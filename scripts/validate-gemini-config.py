@@ -7,72 +7,162 @@ Checks that all workflow files have valid YAML and JSON settings.
 import yaml
 import json
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
-def validate_workflow(workflow_path):
-    """Validate a single workflow file."""
+# Prefer the libyaml-backed loader when PyYAML was built with it
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
+
+def json_loads(text):
+    """Parse JSON, rejecting the NaN/Infinity literals json.loads accepts by default."""
+    def reject_constant(name):
+        # The hook only sees the literal, so report its first occurrence
+        raise json.JSONDecodeError(f"{name} is not valid JSON", text, max(text.find(name), 0))
+    return json.loads(text, parse_constant=reject_constant)
+
+STR_TAG = 'tag:yaml.org,2002:str'
+
+# Resolves '<<' merge keys in place on composed mapping nodes; it keeps no
+# state, so one instance is shared by every validation thread
+_merge_resolver = yaml.constructor.SafeConstructor()
+
+class WorkflowStructureError(ValueError):
+    """Raised when jobs, steps or step inputs have the wrong YAML node type."""
+
+def _mapping_value(node, key):
+    """Return the value node for key in a YAML mapping node, or None."""
+    value = None
+    if isinstance(node, yaml.MappingNode):
+        _merge_resolver.flatten_mapping(node)
+        # Later duplicates win, matching how the constructor builds dicts
+        for key_node, value_node in node.value:
+            if isinstance(key_node, yaml.ScalarNode) and key_node.value == key:
+                value = value_node
+    return value
+
+def _checked_value(node, key, node_type, where):
+    """Return the value node for key, or None if absent; fail if it is present with another type."""
+    value = _mapping_value(node, key)
+    if value is not None and not isinstance(value, node_type):
+        kind = 'mapping' if node_type is yaml.MappingNode else 'sequence'
+        raise WorkflowStructureError(f"{where}'{key}' must be a {kind}, got {value.tag}")
+    return value
+
+def _iter_step_settings(root):
+    """Yield (job_name, settings_node) for each job step that passes a settings input."""
+    jobs = _checked_value(root, 'jobs', yaml.MappingNode, '')
+    if jobs is None:
+        return
+    _merge_resolver.flatten_mapping(jobs)
+    for job_key, job_node in jobs.value:
+        where = f"Job '{job_key.value}': "
+        if not isinstance(job_node, yaml.MappingNode):
+            raise WorkflowStructureError(f"Job '{job_key.value}' must be a mapping, got {job_node.tag}")
+        steps = _checked_value(job_node, 'steps', yaml.SequenceNode, where)
+        if steps is None:
+            continue
+        for index, step in enumerate(steps.value, 1):
+            if not isinstance(step, yaml.MappingNode):
+                raise WorkflowStructureError(f"{where}step {index} must be a mapping, got {step.tag}")
+            inputs = _checked_value(step, 'with', yaml.MappingNode, f"{where}step {index} ")
+            settings = _mapping_value(inputs, 'settings')
+            if settings is not None:
+                yield job_key.value, settings
+
+def validate_workflow(workflow_path, log=print):
+    """Validate a single workflow file, reporting progress through log."""
     try:
+        # Compose the node graph only; just the settings scalars get read,
+        # so triggers, permissions, env etc. are never built into objects
         with open(workflow_path, 'r') as f:
-            workflow = yaml.safe_load(f)
+            root = yaml.compose(f, Loader=SafeLoader)
+        
+        # Empty, truncated or list/scalar documents are not workflows
+        if not isinstance(root, yaml.MappingNode):
+            log(f"  ✗ Workflow root is not a mapping (empty or malformed file)")
+            return False
         
         # Check for settings in workflow
         settings_found = False
-        for job_name, job_data in workflow.get('jobs', {}).items():
-            for step in job_data.get('steps', []):
-                if 'with' in step and 'settings' in step.get('with', {}):
-                    settings_found = True
-                    settings_str = step['with']['settings']
+        for job_name, settings_node in _iter_step_settings(root):
+            settings_found = True
+            
+            # Only a string can hold JSON; numbers, mappings etc. are errors
+            if not (isinstance(settings_node, yaml.ScalarNode) and settings_node.tag == STR_TAG):
+                log(f"  ✗ Job '{job_name}': settings must be a JSON string, got {settings_node.tag}")
+                return False
+            settings_str = settings_node.value
+            
+            # Validate JSON
+            try:
+                settings_obj = json_loads(settings_str)
+                log(f"  ✓ Job '{job_name}': Valid JSON settings ({len(settings_str)} chars)")
+                
+                # Check for required fields
+                if 'model' in settings_obj:
+                    max_turns = settings_obj['model'].get('maxSessionTurns', 'not set')
+                    log(f"    - maxSessionTurns: {max_turns}")
+                if 'mcpServers' in settings_obj:
+                    servers = list(settings_obj['mcpServers'].keys())
+                    log(f"    - MCP Servers: {', '.join(servers)}")
+                if 'tools' in settings_obj:
+                    core_tools = settings_obj['tools'].get('core', [])
+                    log(f"    - Core tools: {len(core_tools)} commands")
                     
-                    # Validate JSON
-                    try:
-                        settings_obj = json.loads(settings_str)
-                        print(f"  ✓ Job '{job_name}': Valid JSON settings ({len(settings_str)} chars)")
-                        
-                        # Check for required fields
-                        if 'model' in settings_obj:
-                            max_turns = settings_obj['model'].get('maxSessionTurns', 'not set')
-                            print(f"    - maxSessionTurns: {max_turns}")
-                        if 'mcpServers' in settings_obj:
-                            servers = list(settings_obj['mcpServers'].keys())
-                            print(f"    - MCP Servers: {', '.join(servers)}")
-                        if 'tools' in settings_obj:
-                            core_tools = settings_obj['tools'].get('core', [])
-                            print(f"    - Core tools: {len(core_tools)} commands")
-                            
-                    except json.JSONDecodeError as e:
-                        print(f"  ✗ Job '{job_name}': JSON Error at position {e.pos}")
-                        print(f"    {e.msg}")
-                        return False
+            except json.JSONDecodeError as e:
+                log(f"  ✗ Job '{job_name}': JSON Error at position {e.pos}")
+                log(f"    {e.msg}")
+                return False
         
         if not settings_found:
-            print(f"  ℹ No Gemini settings found (might be a dispatcher workflow)")
+            log(f"  ℹ No Gemini settings found (might be a dispatcher workflow)")
         
         return True
         
+    except WorkflowStructureError as e:
+        log(f"  ✗ {e}")
+        return False
     except yaml.YAMLError as e:
-        print(f"  ✗ YAML parsing error: {e}")
+        log(f"  ✗ YAML parsing error: {e}")
         return False
     except Exception as e:
-        print(f"  ✗ Unexpected error: {e}")
+        log(f"  ✗ Unexpected error: {e}")
         return False
 
+def _validate_buffered(workflow_path):
+    """Validate a workflow, collecting its output so it can be printed in order."""
+    lines = []
+    valid = validate_workflow(workflow_path, log=lines.append)
+    return valid, lines
+
 def main():
     """Main validation function."""
     print("Gemini CLI Workflow Validator")
     print("=" * 60)
     
-    # Find all Gemini workflow files
-    workflow_dir = Path('.github/workflows')
-    workflow_files = sorted(workflow_dir.glob('gemini-*.yml'))
+    # Validate the files given on the command line, else all Gemini workflows
+    workflow_files = [Path(arg) for arg in sys.argv[1:]]
+    if not workflow_files:
+        workflow_dir = Path('.github/workflows')
+        workflow_files = sorted(workflow_dir.glob('gemini-*.yml'))
     
     if not workflow_files:
         print("No Gemini workflow files found!")
         return 1
     
+    # Each file is independent; parse them concurrently and report in order
+    with ThreadPoolExecutor(max_workers=min(8, len(workflow_files))) as executor:
+        results = list(executor.map(_validate_buffered, workflow_files))
+
     all_valid = True
-    for wf_file in workflow_files:
+    for wf_file, (valid, lines) in zip(workflow_files, results):
         print(f"\n{wf_file.name}:")
-        if not validate_workflow(wf_file):
+        for line in lines:
+            print(line)
+        if not valid:
             all_valid = False
     
     print("\n" + "=" * 60)
@@ -1,6 +1,10 @@
+from concurrent.futures import ProcessPoolExecutor
 from PIL import Image
+import numpy as np
 import os
 
+from process_icons import alpha_bbox, resize_density_chain, write_png
+
 def split_and_save(input_path, output_dir, is_transparent=True):
     """
     Split a 3-column icon sheet into individual icons.
@@ -18,52 +22,66 @@ def split_and_save(input_path, output_dir, is_transparent=True):
     # Crop the top 65% of the image to avoid text labels at bottom
     crop_height = int(height * 0.65)
 
-    def extract_icon(col_index, name):
-        left = col_index * col_width
-        right = (col_index + 1) * col_width
-
-        # Crop the column top part
-        icon_col = img.crop((left, 0, right, crop_height))
+    def extract_icon(arr, col_index, name):
+        col_left = col_index * col_width
+        col_right = (col_index + 1) * col_width
 
-        # Trim transparency to get just the icon
-        bbox = icon_col.getbbox()
+        # Find the icon's alpha bbox within the column top part
+        bbox = alpha_bbox(arr[:crop_height, col_left:col_right, 3])
         if not bbox:
             print(f"Warning: No content found for {name}")
             return
 
-        icon_img = icon_col.crop(bbox)
+        top, bottom, left, right = bbox
+        left, right = col_left + left, col_left + right
+        w, h = right - left, bottom - top
 
         # Make square and add padding for adaptive icon safe zone
         # Adaptive icons are 108dp, safe zone is 66-72dp
         # Make the icon roughly 65% of the total size
-        w, h = icon_img.size
         size = max(w, h)
         final_size = int(size / 0.65)
 
-        final_img = Image.new("RGBA", (final_size, final_size), (0, 0, 0, 0))
-        final_img.paste(icon_img, ((final_size - w) // 2, (final_size - h) // 2), icon_img if icon_img.mode == 'RGBA' else None)
+        # Copy the icon straight from the sheet into the padded canvas
+        canvas = np.zeros((final_size, final_size, 4), dtype=np.uint8)
+        px = (final_size - w) // 2
+        py = (final_size - h) // 2
+        canvas[py:py + h, px:px + w] = arr[top:top + h, left:left + w]
 
         # Resize to 432x432 (XXXHDPI = 108dp × 4)
-        final_img = final_img.resize((432, 432), Image.Resampling.LANCZOS)
-        final_img.save(os.path.join(output_dir, name))
+        final_img = Image.fromarray(canvas).resize((432, 432), Image.Resampling.LANCZOS)
+        write_png(final_img, os.path.join(output_dir, name))
         print(f"Created {name} (432x432)")
 
     if is_transparent:
+        # Decode the sheet once and share the pixel buffer between icons
+        if img.mode != 'RGBA':
+            img = img.convert('RGBA')
+        arr = np.asarray(img)
+
         # Foreground is the first column
-        extract_icon(0, "ic_launcher_foreground.png")
+        extract_icon(arr, 0, "ic_launcher_foreground.png")
 
         # Monochrome is the third column (Material You icon)
-        extract_icon(2, "ic_launcher_monochrome.png")
+        extract_icon(arr, 2, "ic_launcher_monochrome.png")
     else:
         # White background file - extract the background color
         # Sample color from the middle of the second column
+        # Average a small patch so a single stray pixel can't skew the color
         bg_col_center_x = col_width + (col_width // 2)
         bg_col_center_y = crop_height // 2
-        bg_color = img.getpixel((bg_col_center_x, bg_col_center_y))
+        patch_box = (
+            max(bg_col_center_x - 8, 0),
+            max(bg_col_center_y - 8, 0),
+            min(bg_col_center_x + 8, width),
+            min(bg_col_center_y + 8, height),
+        )
+        patch = np.asarray(img.crop(patch_box).convert('RGB'))
+        bg_color = tuple(int(c) for c in np.rint(patch.reshape(-1, 3).mean(axis=0)))
 
         # Create a solid background
-        bg_final = Image.new("RGB", (432, 432), bg_color[:3] if len(bg_color) > 3 else bg_color)
-        bg_final.save(os.path.join(output_dir, "ic_launcher_background.png"))
+        bg_final = Image.new("RGB", (432, 432), bg_color)
+        write_png(bg_final, os.path.join(output_dir, "ic_launcher_background.png"))
         print(f"Created ic_launcher_background.png (432x432, color: {bg_color})")
 
 def create_all_density_icons(xxxhdpi_dir, output_base_dir):
@@ -76,6 +94,9 @@ def create_all_density_icons(xxxhdpi_dir, output_base_dir):
     - XHDPI: 216px (2x)
     - XXHDPI: 324px (3x)
     - XXXHDPI: 432px (4x)
+
+    Each icon is resized in its own worker process, stepping down from
+    the largest density to the smallest.
     """
     densities = {
         "mdpi": 108,
@@ -90,22 +111,29 @@ def create_all_density_icons(xxxhdpi_dir, output_base_dir):
         "ic_launcher_monochrome.png"
     ]
 
+    jobs = []
+    labels = []
     for icon_name in icon_names:
         source_path = os.path.join(xxxhdpi_dir, icon_name)
         if not os.path.exists(source_path):
             print(f"Warning: {icon_name} not found, skipping")
             continue
 
-        source_img = Image.open(source_path)
-
+        outputs = []
         for density, size in densities.items():
             output_dir = os.path.join(output_base_dir, f"mipmap-{density}")
             os.makedirs(output_dir, exist_ok=True)
+            outputs.append((size, os.path.join(output_dir, icon_name)))
+            labels.append(f"{density}/{icon_name} ({size}x{size})")
+        jobs.append((source_path, outputs))
+
+    # One worker per icon; os.cpu_count() can exceed Windows' 61-worker limit
+    if jobs:
+        with ProcessPoolExecutor(max_workers=len(jobs)) as executor:
+            list(executor.map(resize_density_chain, jobs))
 
-            resized = source_img.resize((size, size), Image.Resampling.LANCZOS)
-            output_path = os.path.join(output_dir, icon_name)
-            resized.save(output_path)
-            print(f"Created {density}/{icon_name} ({size}x{size})")
+    for label in labels:
+        print(f"Created {label}")
 
 if __name__ == "__main__":
     # Output directory